@@ -34,6 +34,10 @@ class Config:
     energy_weight: float = 1.0
     force_weight: float = 1.0
     n_splits: int = 5
+    # Only cross validation uses float32. The retained model is trained in float64.
+    use_float32_feature: bool = False
+    # Each feature matrix made in parallel takes its own memory
+    n_feature_jobs: int = 1
     metric: str = "energy"
     # misc
     save_log: bool = False
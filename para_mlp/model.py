@@ -1,16 +1,183 @@
+import copy
 import json
 import pickle
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Sequence, Tuple
 
 import numpy as np
 from numpy.typing import NDArray
 from pymatgen.core.structure import Structure
+from scipy.linalg import LinAlgError, lstsq, solve
+from sklearn.base import clone
 from sklearn.linear_model import Ridge
 from sklearn.preprocessing import StandardScaler
 
 from para_mlp.data_structure import ModelParams
 from para_mlp.featurize import RotationInvariant, SpinFeaturizer
+from para_mlp.utils import make_sample_weight
+
+# The number of rows upcast at once in making normal equation
+_ROW_BLOCK_SIZE = 4096
+
+
+@dataclass
+class NormalEquation:
+    """Terms of normal equation of ridge regression independent of alpha
+
+    The terms are the sums over the data shifted by x_shift and y_shift, so the terms
+    about a part of the data are obtained by subtracting those about the rest.
+    """
+
+    gram: NDArray
+    xty: NDArray
+    x_sum: NDArray
+    y_sum: float
+    n_data: int
+    x_shift: NDArray
+    y_shift: float
+
+    def __sub__(self, other: "NormalEquation") -> "NormalEquation":
+        return NormalEquation(
+            self.gram - other.gram,
+            self.xty - other.xty,
+            self.x_sum - other.x_sum,
+            self.y_sum - other.y_sum,
+            self.n_data - other.n_data,
+            self.x_shift,
+            self.y_shift,
+        )
+
+    def solve(self, alphas: Sequence[float]) -> Tuple[NDArray, NDArray]:
+        """Solve normal equation about the data centered by their own mean
+
+        Args:
+            alphas (Sequence[float]): The regularization strengths
+
+        Returns:
+            Tuple[NDArray, NDArray]: The regression coefficients and the intercepts
+                for each alpha
+        """
+        x_mean = self.x_sum / self.n_data
+        y_mean = self.y_sum / self.n_data
+        # Rank-1 correction from the shift to the mean
+        gram = self.gram - self.n_data * np.outer(x_mean, x_mean)
+        xty = (self.xty - self.n_data * x_mean * y_mean).reshape(-1, 1)
+
+        coefs = np.empty((len(alphas), gram.shape[0]))
+        intercepts = np.empty(len(alphas))
+        for i, alpha in enumerate(alphas):
+            # Copy to keep the Gram matrix reusable for the other alpha values
+            lhs = gram.copy()
+            lhs.flat[:: lhs.shape[0] + 1] += alpha
+            try:
+                coef = solve(lhs, xty, assume_a="pos", overwrite_a=True)
+            except LinAlgError:
+                # Fall back to least squares as Ridge falls back to SVD when the
+                # matrix is singular, e.g. for collinear features and tiny alpha
+                lhs = gram.copy()
+                lhs.flat[:: lhs.shape[0] + 1] += alpha
+                coef = lstsq(lhs, xty)[0]
+            coefs[i] = coef.ravel()
+            intercepts[i] = (self.y_shift + (y_mean - np.dot(x_mean, coefs[i]))) - (
+                np.dot(self.x_shift, coefs[i])
+            )
+
+        return coefs, intercepts
+
+    def predict(
+        self, x_shifted: NDArray, coefs: NDArray, intercepts: NDArray
+    ) -> NDArray:
+        """Predict objective variable from the rows of feature matrix shifted by x_shift
+
+        Args:
+            x_shifted (NDArray): The rows of feature matrix shifted by x_shift
+            coefs (NDArray): The regression coefficients, or those for each alpha
+            intercepts (NDArray): The intercept, or those for each alpha
+
+        Returns:
+            NDArray: objective variable. The columns correspond to alpha values if
+                those for each alpha are given.
+        """
+        return x_shifted @ coefs.T + (intercepts + coefs @ self.x_shift)
+
+
+def _products_in_float64(x: NDArray, y: NDArray) -> Tuple[NDArray, NDArray]:
+    """Compute the Gram matrix and the product of x and y accumulated in float64
+
+    Args:
+        x (NDArray): The feature matrix
+        y (NDArray): The targets in float64
+
+    Returns:
+        Tuple[NDArray, NDArray]: The Gram matrix and the product of x and y
+    """
+    if x.dtype == np.float64:
+        return x.T @ x, (x.T @ y.reshape(-1, 1)).ravel()
+
+    # Upcast by blocks of rows to avoid copying the whole matrix in float64.
+    # The Gram matrix accumulated in float32 may not be positive definite.
+    gram = np.zeros((x.shape[1], x.shape[1]))
+    xty = np.zeros(x.shape[1])
+    for begin in range(0, x.shape[0], _ROW_BLOCK_SIZE):
+        end = begin + _ROW_BLOCK_SIZE
+        x_block = x[begin:end].astype(np.float64)
+        gram += x_block.T @ x_block
+        xty += x_block.T @ y[begin:end]
+
+    return gram, xty
+
+
+def make_normal_equation(x: NDArray, y: NDArray) -> NormalEquation:
+    """Make normal equation of ridge regression about all the given data
+
+    x is centered in place by its mean in the same way as Ridge with copy_X=False,
+    which avoids copying the feature matrix. Pass a copy if x is used afterwards.
+
+    Args:
+        x (NDArray): The feature matrix. It is centered in place.
+        y (NDArray): The targets
+
+    Returns:
+        NormalEquation: The normal equation shifted by the mean of the data
+    """
+    x_shift = x.mean(axis=0, dtype=np.float64)
+    y_shift = y.mean()
+    x -= x_shift
+    gram, xty = _products_in_float64(x, y - y_shift)
+
+    # The data are centered, so their sums are regarded as zero
+    return NormalEquation(
+        gram, xty, np.zeros(x.shape[1]), 0.0, x.shape[0], x_shift, y_shift
+    )
+
+
+def make_normal_equation_of_subset(
+    x_subset: NDArray, y_subset: NDArray, normal_equation: NormalEquation
+) -> NormalEquation:
+    """Make normal equation about a subset of the data of given normal equation
+
+    Args:
+        x_subset (NDArray): The rows of feature matrix centered by
+            make_normal_equation()
+        y_subset (NDArray): The targets of the rows
+        normal_equation (NormalEquation): The normal equation about all the data
+
+    Returns:
+        NormalEquation: The normal equation with the same shift as the given one
+    """
+    y_shifted = y_subset - normal_equation.y_shift
+    gram, xty = _products_in_float64(x_subset, y_shifted)
+
+    return NormalEquation(
+        gram,
+        xty,
+        x_subset.sum(axis=0, dtype=np.float64),
+        float(y_shifted.sum()),
+        x_subset.shape[0],
+        normal_equation.x_shift,
+        normal_equation.y_shift,
+    )
 
 
 class RILRM:
@@ -69,6 +236,51 @@ class RILRM:
     def x(self, new_feature) -> None:
         self._x = new_feature
 
+    @property
+    def alpha(self) -> float:
+        """Return regularization strength of ridge regression
+
+        Returns:
+            float: The regularization strength
+        """
+        return self._ridge.alpha
+
+    @alpha.setter
+    def alpha(self, new_alpha: float) -> None:
+        self._ri.model_params.alpha = new_alpha
+        self._ridge.alpha = new_alpha
+
+    @property
+    def coef(self) -> NDArray:
+        """Return regression coefficients of ridge regression
+
+        Returns:
+            NDArray: The regression coefficients
+        """
+        return self._ridge.coef_
+
+    @property
+    def intercept(self) -> float:
+        """Return intercept of ridge regression
+
+        Returns:
+            float: The intercept
+        """
+        return self._ridge.intercept_
+
+    def copy_sharing_feature(self) -> "RILRM":
+        """Copy the model with an unfitted regressor sharing the feature matrix
+
+        Returns:
+            RILRM: The copied model. The feature matrix and the scaler are shared
+                with the original one.
+        """
+        new_model = copy.copy(self)
+        new_model._ri = copy.deepcopy(self._ri)
+        new_model._ridge = clone(self._ridge)
+
+        return new_model
+
     def apply_weight(
         self,
         energy_weight: float,
@@ -85,19 +297,17 @@ class RILRM:
                 about high energy structures
             n_energy_data (int): The number of energy data for training
         """
-        if energy_weight != 1.0:
-            self._x[:n_energy_data] *= energy_weight
-
-        if force_weight != 1.0:
-            self._x[n_energy_data:] *= force_weight
-
-        for high_energy_struct_dict in high_energy_struct_dict_list:
-            self._x[
-                high_energy_struct_dict["yids"]["energy"]
-            ] *= high_energy_struct_dict["weight"]
-            self._x[
-                high_energy_struct_dict["yids"]["force"]
-            ] *= high_energy_struct_dict["weight"]
+        sample_weight = make_sample_weight(
+            self._x.shape[0],
+            n_energy_data,
+            energy_weight,
+            force_weight,
+            high_energy_struct_dict_list,
+        )
+
+        # Scale all the rows of feature matrix in one pass
+        if np.any(sample_weight != 1.0):
+            self._x *= sample_weight[:, np.newaxis]
 
     def train(
         self,
@@ -112,6 +322,18 @@ class RILRM:
         """
         self._ridge.fit(self._x[train_index], y_kfold[train_index])
 
+    def train_by_normal_equation(self, normal_equation: NormalEquation) -> None:
+        """Execute training of model by solving normal equation with Cholesky
+
+        Args:
+            normal_equation (NormalEquation): The normal equation about training data
+        """
+        coefs, intercepts = normal_equation.solve((self.alpha,))
+
+        self._ridge.coef_ = coefs[0]
+        self._ridge.intercept_ = intercepts[0]
+        self._ridge.n_features_in_ = coefs.shape[1]
+
     def predict(
         self,
         structure_set: List[Structure] = None,
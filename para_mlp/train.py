@@ -1,20 +1,33 @@
-import copy
 import gc
 import json
 import logging
-import statistics as stat
+import math
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
+from joblib import Parallel, cpu_count, delayed, effective_n_jobs
+from numpy.typing import NDArray
 from sklearn.model_selection import KFold, ParameterGrid
-from tqdm import tqdm
+from threadpoolctl import threadpool_limits
 
 from para_mlp.config import Config
 from para_mlp.data_structure import ModelParams
-from para_mlp.model import RILRM
+from para_mlp.model import (
+    RILRM,
+    NormalEquation,
+    make_normal_equation,
+    make_normal_equation_of_subset,
+)
 from para_mlp.pred import record_energy_prediction_accuracy
-from para_mlp.utils import average, make_yids_for_structure_ids, rmse, round_to_4
+from para_mlp.utils import (
+    average,
+    make_sample_weight,
+    make_yids_for_structure_ids,
+    rmse,
+    round_to_4,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -29,22 +42,19 @@ def make_param_grid(config: Config) -> Dict[str, Tuple[Any, ...]]:
         Dict[str, Tuple[Any]]: The parameter grid. All the possible values are stored
             for each key.
     """
-    cutoff_radius_num = (
-        int((config.cutoff_radius_max - config.cutoff_radius_min) / 2.0) + 1
-    )
+    # The step of cutoff radius is 2.0 and the maximum is included only if reached
     cutoff_radius = tuple(
-        radius
-        for radius in np.linspace(
-            config.cutoff_radius_min, config.cutoff_radius_max, cutoff_radius_num
-        )
+        np.arange(
+            config.cutoff_radius_min, config.cutoff_radius_max + 1e-9, 2.0
+        ).tolist()
     )
     gaussian_params2_num = tuple(
-        map(
-            int,
-            np.arange(
-                config.gaussian_params2_num_min, config.gaussian_params2_num_max + 5, 5
-            ),
-        )
+        np.arange(
+            config.gaussian_params2_num_min,
+            config.gaussian_params2_num_max + 5,
+            5,
+            dtype=int,
+        ).tolist()
     )
 
     param_grid = {
@@ -89,36 +99,164 @@ def arrange_model_from_hyper_params(hyper_params: dict, config: Config) -> RILRM
     return model
 
 
-def cross_validate(
+def _blas_threadpool_limits(n_threads: int) -> threadpool_limits:
+    """Limit the number of BLAS threads unless all the cores are available
+
+    Args:
+        n_threads (int): The number of BLAS threads
+
+    Returns:
+        threadpool_limits: The context manager to limit the BLAS threads
+    """
+    limits = n_threads if n_threads < cpu_count() else None
+    return threadpool_limits(limits=limits, user_api="blas")
+
+
+@contextmanager
+def _gc_disabled() -> Iterator[None]:
+    """Disable the cyclic garbage collector temporarily
+
+    NumPy arrays and dicts allocated in the hot loop are freed by reference
+    counting, so the collector only adds pauses there.
+
+    Yields:
+        Iterator[None]: Nothing
+    """
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _fold_metrics(
+    diff: NDArray,
+    n_energy_valid: int,
+    n_atoms_in_structure: int,
+    use_force: bool,
+) -> Tuple[float, float, Optional[float]]:
+    """Calculate RMSEs of one fold from the residual of validation data
+
+    Args:
+        diff (NDArray): The residual of validation data. Energy data are followed
+            by force data.
+        n_energy_valid (int): The number of energy data for validation
+        n_atoms_in_structure (int): The number of atoms in structure
+        use_force (bool): Whether to use force
+
+    Returns:
+        Tuple[float, float, Optional[float]]: In order, RMSE(target),
+            RMSE(energy, meV/atom), and RMSE(force, eV/ang). The last one is None
+            if force is not used.
+    """
+    diff_energy, diff_force = diff[:n_energy_valid], diff[n_energy_valid:]
+    sum_squares_energy = float(np.dot(diff_energy, diff_energy))
+    sum_squares_force = float(np.dot(diff_force, diff_force))
+
+    rmse_target = math.sqrt((sum_squares_energy + sum_squares_force) / diff.shape[0])
+    rmse_energy = (
+        math.sqrt(sum_squares_energy / n_energy_valid) / n_atoms_in_structure * 1e3
+    )
+    rmse_force = None
+    if use_force:
+        rmse_force = math.sqrt(sum_squares_force / (diff.shape[0] - n_energy_valid))
+
+    return rmse_target, rmse_energy, rmse_force
+
+
+def _run_fold(
+    yids_for_valid: Dict[str, NDArray],
+    y_valid: NDArray,
+    x_centered: NDArray,
+    full_normal_equation: NormalEquation,
+    alphas: Tuple[float, ...],
+    n_atoms_in_structure: int,
+    use_force: bool,
+) -> List[Tuple[float, float, Optional[float]]]:
+    """Train the test model by one fold and evaluate it for each alpha
+
+    Args:
+        yids_for_valid (Dict[str, NDArray]): The yids for validation
+        y_valid (NDArray): The targets for validation, which are composed of
+            energy data followed by force data
+        x_centered (NDArray): The feature matrix centered by make_normal_equation()
+        full_normal_equation (NormalEquation): The normal equation about all the
+            kfold data
+        alphas (Tuple[float, ...]): All the alpha values to be evaluated
+        n_atoms_in_structure (int): The number of atoms in structure
+        use_force (bool): Whether to use force
+
+    Returns:
+        List[Tuple[float, float, Optional[float]]]: The scores for each alpha.
+            Each score is composed of RMSE(target), RMSE(energy, meV/atom),
+            and RMSE(force, eV/ang) in order. The last one is None if force is
+            not used.
+    """
+    # Only the validation rows are copied. The training data are the rest of
+    # the kfold data, so their normal equation is obtained by subtraction.
+    x_valid = x_centered[yids_for_valid["target"]]
+    train_normal_equation = full_normal_equation - make_normal_equation_of_subset(
+        x_valid, y_valid, full_normal_equation
+    )
+    coefs, intercepts = train_normal_equation.solve(alphas)
+    y_predict_valid = full_normal_equation.predict(x_valid, coefs, intercepts)
+
+    n_energy_valid = len(yids_for_valid["energy"])
+
+    return [
+        _fold_metrics(
+            y_predict_valid[:, alpha_id] - y_valid,
+            n_energy_valid,
+            n_atoms_in_structure,
+            use_force,
+        )
+        for alpha_id in range(len(alphas))
+    ]
+
+
+def _evaluate_feature_params(
+    feature_params: Dict[str, Any],
+    alphas: Tuple[float, ...],
     config: Config,
-    param_grid: Dict[str, Tuple],
     kfold_dataset: Dict[str, Any],
     high_energy_struct_dict_list: List[Dict[str, Any]],
-) -> RILRM:
-    """Execute cross validation
+    folds: List[Tuple[Dict[str, NDArray], NDArray]],
+    n_threads: int,
+) -> List[Tuple[float, RILRM, Optional[NDArray], Dict[str, Any], Dict[str, Any]]]:
+    """Evaluate hyper parameters sharing one feature matrix by KFold cross validation
 
     Args:
+        feature_params (Dict[str, Any]): Hyper parameters to make feature matrix,
+            i.e. cutoff_radius and gaussian_params2_num
+        alphas (Tuple[float, ...]): All the alpha values to be evaluated
         config (Config): Config to make machine learning model
-        param_grid (Dict[str, Tuple]): The parameter grid. All the possible values
-            are stored for each key.
         kfold_dataset (Dict[str, Any]): store energy, force, and structure set
         high_energy_struct_dict_list (List[Dict[str, Any]]): List of the dict
             about high energy structures
+        folds (List[Tuple[Dict[str, NDArray], NDArray]]): The yids for validation
+            and the targets for validation about each fold
+        n_threads (int): The number of threads available to this evaluation
 
     Returns:
-        RILRM: Model by selected cross validation
+        List[Tuple[float, RILRM, Optional[NDArray], Dict[str, Any], Dict[str, Any]]]:
+            The results for each alpha. Each result is composed of the average of
+            RMSE(target), the model without feature matrix, its prediction for
+            the kfold data, the hyper parameters, and the summary of the test
+            model in order. Only the best model among them is trained by all the
+            kfold data and has the prediction, while the others have None. If the
+            feature matrix is made in float32, no model is trained.
+            The keys of the summary are 'shape', 'memory', 'target', 'energy',
+            and 'force'.
     """
     n_all_kfold_structure = len(kfold_dataset["structures"])
-    index_matrix = np.zeros(n_all_kfold_structure)
-    force_id_unit = (kfold_dataset["target"].shape[0] // n_all_kfold_structure) - 1
     n_atoms_in_structure = len(kfold_dataset["structures"][0].sites)
 
-    retained_model_rmse = 1e10
-
-    for hyper_params in tqdm(ParameterGrid(param_grid)):
-
+    # Avoid oversubscription of BLAS threads among parallel workers
+    with _blas_threadpool_limits(n_threads), _gc_disabled():
         test_model = arrange_model_from_hyper_params(
-            hyper_params=hyper_params,
+            hyper_params={"alpha": alphas[0], **feature_params},
             config=config,
         )
 
@@ -134,75 +272,207 @@ def cross_validate(
             high_energy_struct_dict_list,
             n_all_kfold_structure,
         )
+        if config.use_float32_feature:
+            # Halve the memory traffic in making Gram matrix and prediction.
+            # The retained model is trained again in float64 by train_and_eval().
+            test_model.x = test_model.x.astype(np.float32)
+
+        # The feature matrix is centered in place, so the folds share it and
+        # the normal equation about all the kfold data without any copy. It
+        # doesn't depend on alpha, so it is made once for the group.
+        full_normal_equation = make_normal_equation(
+            test_model.x, kfold_dataset["target"]
+        )
 
-        logger.debug(" Test model")
-        logger.debug("    params : %s", hyper_params)
-        logger.debug(f"    shape  : {test_model.x.shape}")
-        logger.debug(f"    memory : {round(test_model.x.__sizeof__() / 1e9, 3)} (GB)")
+        # The threads are shared between the folds and BLAS in each fold
+        n_fold_jobs = min(config.n_splits, n_threads)
+        with _blas_threadpool_limits(max(1, n_threads // n_fold_jobs)):
+            fold_results = Parallel(n_jobs=n_fold_jobs, backend="threading")(
+                delayed(_run_fold)(
+                    yids_for_valid,
+                    y_valid,
+                    test_model.x,
+                    full_normal_equation,
+                    alphas,
+                    n_atoms_in_structure,
+                    config.use_force,
+                )
+                for yids_for_valid, y_valid in folds
+            )
 
-        test_model_rmses, test_model_rmses_energy, test_model_rmses_force = [], [], []
-        kf = KFold(n_splits=config.n_splits, shuffle=True, random_state=0)
-        for train_index, valid_index in kf.split(index_matrix):
-            yids_for_train = make_yids_for_structure_ids(
-                train_index, n_all_kfold_structure, force_id_unit, config.use_force
+        results = []
+        best_result_id, best_rmse = None, math.inf
+        for alpha, alpha_scores in zip(alphas, zip(*fold_results)):
+            test_model_rmses, test_model_rmses_energy, test_model_rmses_force = (
+                list(rmses) for rmses in zip(*alpha_scores)
             )
-            yids_for_valid = make_yids_for_structure_ids(
-                valid_index, n_all_kfold_structure, force_id_unit, config.use_force
+            if not config.use_force:
+                test_model_rmses_force = []
+
+            test_model_summary = {
+                "shape": test_model.x.shape,
+                "memory": round(test_model.x.__sizeof__() / 1e9, 3),
+                "target": test_model_rmses,
+                "energy": test_model_rmses_energy,
+                "force": test_model_rmses_force,
+            }
+
+            alpha_model = test_model.copy_sharing_feature()
+            alpha_model.alpha = alpha
+            # Free memory and avoid sending the feature matrix back to
+            # the parent process
+            alpha_model.x = None
+
+            test_model_rmse = average(test_model_rmses)
+            if test_model_rmse < best_rmse:
+                best_result_id, best_rmse = len(results), test_model_rmse
+
+            results.append(
+                (
+                    test_model_rmse,
+                    alpha_model,
+                    None,
+                    {"alpha": alpha, **feature_params},
+                    test_model_summary,
+                )
             )
-            test_model.train(
-                yids_for_train["target"],
-                kfold_dataset["target"],
+
+        # Only the best model of the group can be retained in the same order as
+        # cross_validate(), so only it is trained by all the kfold data here to
+        # avoid remaking the feature matrix of the retained model afterwards
+        if best_result_id is not None and not config.use_float32_feature:
+            best_result = results[best_result_id]
+            best_model = best_result[1]
+            best_model.train_by_normal_equation(full_normal_equation)
+            y_predict = full_normal_equation.predict(
+                test_model.x, best_model.coef, best_model.intercept
             )
+            results[best_result_id] = best_result[:2] + (y_predict,) + best_result[3:]
 
-            y_predict = test_model.predict()
+    return results
 
-            test_model_rmses.append(
-                rmse(
-                    y_predict[yids_for_valid["target"]],
-                    kfold_dataset["target"][yids_for_valid["target"]],
-                )
-            )
-            test_model_rmses_energy.append(
-                rmse(
-                    y_predict[yids_for_valid["energy"]] / n_atoms_in_structure,
-                    kfold_dataset["target"][yids_for_valid["energy"]]
-                    / n_atoms_in_structure,
-                )
-                * 1e3
-            )
-            if config.use_force:
-                test_model_rmses_force.append(
-                    rmse(
-                        y_predict[yids_for_valid["force"]],
-                        kfold_dataset["target"][yids_for_valid["force"]],
-                    )
-                )
 
-        test_model_rmse = average(test_model_rmses)
-        rmse_std_dev = stat.stdev(test_model_rmses)
-        test_model_rmses = [round_to_4(rmse) for rmse in test_model_rmses]
-        logger.debug("    RMSE(target)         : %s", test_model_rmses)
-        logger.debug(f"    RMSE(target, average): {test_model_rmse}")
-        logger.debug(f"    RMSE(target, std_dev): {rmse_std_dev}")
+def _log_test_model(
+    hyper_params: Dict[str, Any], test_model_summary: Dict[str, Any]
+) -> None:
+    """Log the result of cross validation about one test model
 
-        rmse_energy_average = average(test_model_rmses_energy)
-        rmse_energy_std_dev = stat.stdev(test_model_rmses_energy)
-        test_model_rmses_energy = [round_to_4(rmse) for rmse in test_model_rmses_energy]
-        logger.debug("    RMSE(energy, meV/atom)         : %s", test_model_rmses_energy)
-        logger.debug(f"    RMSE(energy, average, meV/atom): {rmse_energy_average}")
-        logger.debug(f"    RMSE(energy, std_dev, meV/atom): {rmse_energy_std_dev}")
+    Args:
+        hyper_params (Dict[str, Any]): Hyper parameters
+        test_model_summary (Dict[str, Any]): The summary of the test model
+    """
+    logger.debug(" Test model")
+    logger.debug("    params : %s", hyper_params)
+    logger.debug(f"    shape  : {test_model_summary['shape']}")
+    logger.debug(f"    memory : {test_model_summary['memory']} (GB)")
+
+    test_model_rmses = np.asarray(test_model_summary["target"])
+    test_model_rmse = float(test_model_rmses.mean())
+    rmse_std_dev = float(test_model_rmses.std(ddof=1))
+    test_model_rmses = [round_to_4(rmse) for rmse in test_model_rmses.tolist()]
+    logger.debug("    RMSE(target)         : %s", test_model_rmses)
+    logger.debug(f"    RMSE(target, average): {test_model_rmse}")
+    logger.debug(f"    RMSE(target, std_dev): {rmse_std_dev}")
+
+    test_model_rmses_energy = np.asarray(test_model_summary["energy"])
+    rmse_energy_average = float(test_model_rmses_energy.mean())
+    rmse_energy_std_dev = float(test_model_rmses_energy.std(ddof=1))
+    test_model_rmses_energy = [
+        round_to_4(rmse) for rmse in test_model_rmses_energy.tolist()
+    ]
+    logger.debug("    RMSE(energy, meV/atom)         : %s", test_model_rmses_energy)
+    logger.debug(f"    RMSE(energy, average, meV/atom): {rmse_energy_average}")
+    logger.debug(f"    RMSE(energy, std_dev, meV/atom): {rmse_energy_std_dev}")
+
+    test_model_rmses_force = np.asarray(test_model_summary["force"])
+    if test_model_rmses_force.size > 0:
+        rmse_force_average = float(test_model_rmses_force.mean())
+        rmse_force_std_dev = float(test_model_rmses_force.std(ddof=1))
+        test_model_rmses_force = [
+            round_to_4(rmse) for rmse in test_model_rmses_force.tolist()
+        ]
+        logger.debug("    RMSE(force, eV/ang)            : %s", test_model_rmses_force)
+        logger.debug(f"    RMSE(force, average, eV/ang)   : {rmse_force_average}")
+        logger.debug(f"    RMSE(force, std_dev, eV/ang)   : {rmse_force_std_dev}")
 
-        if config.use_force:
-            rmse_force_average = average(test_model_rmses_force)
-            rmse_force_std_dev = stat.stdev(test_model_rmses_force)
-            test_model_rmses_force = [
-                round_to_4(rmse) for rmse in test_model_rmses_force
-            ]
-            logger.debug(
-                "    RMSE(force, eV/ang)            : %s", test_model_rmses_force
-            )
-            logger.debug(f"    RMSE(force, average, eV/ang)   : {rmse_force_average}")
-            logger.debug(f"    RMSE(force, std_dev, eV/ang)   : {rmse_force_std_dev}")
+
+def cross_validate(
+    config: Config,
+    param_grid: Dict[str, Tuple],
+    kfold_dataset: Dict[str, Any],
+    high_energy_struct_dict_list: List[Dict[str, Any]],
+) -> Tuple[RILRM, Optional[NDArray]]:
+    """Execute cross validation
+
+    Args:
+        config (Config): Config to make machine learning model
+        param_grid (Dict[str, Tuple]): The parameter grid. All the possible values
+            are stored for each key.
+        kfold_dataset (Dict[str, Any]): store energy, force, and structure set
+        high_energy_struct_dict_list (List[Dict[str, Any]]): List of the dict
+            about high energy structures
+
+    Returns:
+        Tuple[RILRM, Optional[NDArray]]: Model by selected cross validation, which
+            has been trained by all the kfold data, and its prediction for the
+            kfold data. If the feature matrix is made in float32, the model is not
+            trained and the prediction is None.
+    """
+    # The splits of KFold and the targets are common to all the hyper parameters
+    n_all_kfold_structure = len(kfold_dataset["structures"])
+    force_id_unit = (kfold_dataset["target"].shape[0] // n_all_kfold_structure) - 1
+    kf = KFold(n_splits=config.n_splits, shuffle=True, random_state=0)
+    folds = []
+    # KFold only needs the number of samples, so no data is allocated
+    # The training data of each fold are the rest of the validation data
+    for _, valid_index in kf.split(np.empty((n_all_kfold_structure, 0))):
+        yids_for_valid = make_yids_for_structure_ids(
+            valid_index, n_all_kfold_structure, force_id_unit, config.use_force
+        )
+        # Convert to arrays once to make the indexing in each fold cheap
+        yids_for_valid = {key: np.array(yids) for key, yids in yids_for_valid.items()}
+        # The targets don't depend on hyper parameters. yids_for_valid["target"]
+        # is composed of energy ids followed by force ids.
+        y_valid = np.take(kfold_dataset["target"], yids_for_valid["target"])
+        folds.append((yids_for_valid, y_valid))
+
+    # The feature matrix doesn't depend on alpha, so it is made once per group
+    feature_param_grid = {key: val for key, val in param_grid.items() if key != "alpha"}
+    # Each worker holds its own feature matrix, so the number of workers is
+    # config.n_feature_jobs at most. The cores are divided among the workers.
+    n_workers = min(
+        effective_n_jobs(config.n_feature_jobs), len(ParameterGrid(feature_param_grid))
+    )
+    n_threads = max(1, cpu_count() // n_workers)
+    group_results_list = Parallel(
+        n_jobs=n_workers, backend="loky", batch_size=1, verbose=1
+    )(
+        delayed(_evaluate_feature_params)(
+            feature_params,
+            param_grid["alpha"],
+            config,
+            kfold_dataset,
+            high_energy_struct_dict_list,
+            folds,
+            n_threads,
+        )
+        for feature_params in ParameterGrid(feature_param_grid)
+    )
+    # Follow the order of ParameterGrid(param_grid), where alpha varies the slowest
+    results = [
+        group_results[alpha_id]
+        for alpha_id in range(len(param_grid["alpha"]))
+        for group_results in group_results_list
+    ]
+
+    # Log in the parent process because the workers don't share its log handlers.
+    # The formatting of the scores is skipped unless it is actually logged.
+    is_debug_enabled = logger.isEnabledFor(logging.DEBUG)
+    retained_model_rmse = 1e10
+    for result in results:
+        test_model_rmse, _, _, hyper_params, test_model_summary = result
+        if is_debug_enabled:
+            _log_test_model(hyper_params, test_model_summary)
 
         # if config.metric == "energy":
         #     test_model_rmse = rmse_energy_average
@@ -215,11 +485,13 @@ def cross_validate(
         #     sys.exit(1)
 
         if test_model_rmse < retained_model_rmse:
-            retained_model_rmse = test_model_rmse
-            retained_model = copy.deepcopy(test_model)
-            retained_model_params = copy.deepcopy(hyper_params)
-            # Free memory by assigning a new value
-            retained_model.x = None
+            (
+                retained_model_rmse,
+                retained_model,
+                y_predict,
+                retained_model_params,
+                _,
+            ) = result
 
         logger.debug(" Retained model")
         logger.debug("    params      : %s", retained_model_params)
@@ -228,11 +500,11 @@ def cross_validate(
     logger.info(" Best model")
     logger.info("    params: %s", retained_model_params)
 
-    # Free memory by deleting unused object
-    del test_model
+    # Free memory by deleting unused objects
+    del group_results_list, results
     gc.collect()
 
-    return retained_model
+    return retained_model, y_predict
 
 
 def train_and_eval(
@@ -261,19 +533,14 @@ def train_and_eval(
             high_energy_struct_dict = json.load(f)
         high_energy_struct_dict_list.append(high_energy_struct_dict)
 
-        kfold_dataset["target"][
-            high_energy_struct_dict["yids"]["energy"]
-        ] *= high_energy_struct_dict["weight"]
-        kfold_dataset["target"][
-            high_energy_struct_dict["yids"]["force"]
-        ] *= high_energy_struct_dict["weight"]
-
     n_all_kfold_structure = len(kfold_dataset["structures"])
-    if config.energy_weight != 1.0:
-        kfold_dataset["target"][:n_all_kfold_structure] *= config.energy_weight
-
-    if config.force_weight != 1.0:
-        kfold_dataset["target"][n_all_kfold_structure:] *= config.force_weight
+    kfold_dataset["target"] *= make_sample_weight(
+        kfold_dataset["target"].shape[0],
+        n_all_kfold_structure,
+        config.energy_weight,
+        config.force_weight,
+        high_energy_struct_dict_list,
+    )
 
     # Cross validate, if necessary
     param_grid = make_param_grid(config)
@@ -284,40 +551,45 @@ def train_and_eval(
             config=config,
         )
     else:
-        retained_model = cross_validate(
+        # The retained model has already been trained by all the training data
+        # unless the feature matrix is made in float32 in cross validation
+        retained_model, y_predict = cross_validate(
             config=config,
             param_grid=param_grid,
             kfold_dataset=kfold_dataset,
             high_energy_struct_dict_list=high_energy_struct_dict_list,
         )
 
-    # Train retained model by using all the training data
-    retained_model.make_feature(
-        kfold_dataset["structures"],
-        kfold_dataset["n_structure"],
-        kfold_dataset["types_list"],
-        make_scaler=True,
-    )
-    retained_model.apply_weight(
-        config.energy_weight,
-        config.force_weight,
-        high_energy_struct_dict_list,
-        n_all_kfold_structure,
-    )
+    if dont_cross_validate or config.use_float32_feature:
+        # Train retained model by using all the training data in float64
+        retained_model.make_feature(
+            kfold_dataset["structures"],
+            kfold_dataset["n_structure"],
+            kfold_dataset["types_list"],
+            make_scaler=True,
+        )
+        retained_model.apply_weight(
+            config.energy_weight,
+            config.force_weight,
+            high_energy_struct_dict_list,
+            n_all_kfold_structure,
+        )
 
-    logger.debug(" Retained model")
-    logger.debug(f"    shape  : {retained_model.x.shape}")
-    logger.debug(f"    memory : {round(retained_model.x.__sizeof__() / 1e9, 3)} (GB)")
+        logger.debug(" Retained model")
+        logger.debug(f"    shape  : {retained_model.x.shape}")
+        logger.debug(
+            f"    memory : {round(retained_model.x.__sizeof__() / 1e9, 3)} (GB)"
+        )
 
-    train_index = [i for i in range(kfold_dataset["target"].shape[0])]
-    retained_model.train(
-        train_index,
-        kfold_dataset["target"],
-    )
+        train_index = [i for i in range(kfold_dataset["target"].shape[0])]
+        retained_model.train(
+            train_index,
+            kfold_dataset["target"],
+        )
 
-    # Evaluate model's transferabilty for kfold data
-    y_predict = retained_model.predict()
+        y_predict = retained_model.predict()
 
+    # Evaluate model's transferabilty for kfold data
     eid_begin = 0
     fid_begin = len(kfold_dataset["structures"])
     energy_rmses, force_rmses = [], []
@@ -4,7 +4,7 @@ import site
 from itertools import product
 from math import floor, log10
 from pathlib import Path
-from typing import Dict, List, Sequence
+from typing import Any, Dict, List, Sequence
 
 import numpy as np
 from numpy.typing import NDArray
@@ -49,6 +49,41 @@ def rmse(y_predict: NDArray, y_target: NDArray) -> float:
     return np.sqrt(np.mean(np.square(y_predict - y_target)))
 
 
+def make_sample_weight(
+    n_data: int,
+    n_energy_data: int,
+    energy_weight: float,
+    force_weight: float,
+    high_energy_struct_dict_list: List[Dict[str, Any]],
+) -> NDArray:
+    """Make the weight of each data, which is applied to targets and feature matrix
+
+    Args:
+        n_data (int): The number of data, i.e. the length of targets
+        n_energy_data (int): The number of energy data
+        energy_weight (float): Weight for energy data
+        force_weight (float): Weight for force data
+        high_energy_struct_dict_list (List[Dict[str, Any]]): List of the dict
+            about high energy structures
+
+    Returns:
+        NDArray: The weight of each data. The shape is (n_data,).
+    """
+    sample_weight = np.empty(n_data)
+    sample_weight[:n_energy_data] = energy_weight
+    sample_weight[n_energy_data:] = force_weight
+
+    # Energy ids and force ids never overlap, so they are scattered at once
+    for high_energy_struct_dict in high_energy_struct_dict_list:
+        high_energy_yids = [
+            *high_energy_struct_dict["yids"]["energy"],
+            *high_energy_struct_dict["yids"]["force"],
+        ]
+        sample_weight[high_energy_yids] *= high_energy_struct_dict["weight"]
+
+    return sample_weight
+
+
 def make_yids_for_structure_ids(
     structure_id: List[int],
     energy_id_length: int,
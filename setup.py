@@ -24,6 +24,8 @@ setup(
         "numpy",
         "scikit-learn==1.1.2",
         "joblib",
+        "threadpoolctl",
+        "scipy",
         "tqdm",
         "dataclasses_json",
         "click",
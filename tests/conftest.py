@@ -54,6 +54,15 @@ def test_config():
     return test_config_dict
 
 
+@pytest.fixture()
+def ridge_dataset():
+    rng = np.random.default_rng(0)
+    x = rng.normal(loc=1.0, scale=2.0, size=(200, 10))
+    y = x @ rng.normal(size=10) + rng.normal(size=200) + 3.0
+
+    return x, y
+
+
 @pytest.fixture()
 def high_energy_sids() -> List[int]:
     high_energy_structures_path = (
@@ -1,6 +1,12 @@
 import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression, Ridge
 
-from para_mlp.model import make_content_of_lammps_file
+from para_mlp.model import (
+    make_content_of_lammps_file,
+    make_normal_equation,
+    make_normal_equation_of_subset,
+)
 
 
 def test_make_content_of_lammps_file(
@@ -49,3 +55,83 @@ def test_load_model(
             ),
             atol=1e-09,
         )
+
+
+def test_make_normal_equation(ridge_dataset):
+    x, y = ridge_dataset
+    ridge = Ridge(alpha=1e-2).fit(x, y)
+
+    x_centered = x.copy()
+    normal_equation = make_normal_equation(x_centered, y)
+    coefs, intercepts = normal_equation.solve((1e-2,))
+
+    np.testing.assert_allclose(x_centered, x - x.mean(axis=0))
+    np.testing.assert_allclose(coefs[0], ridge.coef_, rtol=1e-10)
+    assert intercepts[0] == pytest.approx(ridge.intercept_, rel=1e-10)
+    np.testing.assert_allclose(
+        normal_equation.predict(x_centered, coefs[0], intercepts[0]),
+        ridge.predict(x),
+        rtol=1e-10,
+    )
+
+
+def test_make_normal_equation_of_subset(ridge_dataset):
+    x, y = ridge_dataset
+    valid_index = np.arange(0, 200, 5)
+    train_index = np.setdiff1d(np.arange(200), valid_index)
+    alphas = (1e-1, 1e-3)
+
+    x_centered = x.copy()
+    normal_equation = make_normal_equation(x_centered, y)
+    x_valid = x_centered[valid_index]
+    train_normal_equation = normal_equation - make_normal_equation_of_subset(
+        x_valid, y[valid_index], normal_equation
+    )
+    coefs, intercepts = train_normal_equation.solve(alphas)
+    y_predict_valid = normal_equation.predict(x_valid, coefs, intercepts)
+
+    for alpha_id, alpha in enumerate(alphas):
+        ridge = Ridge(alpha=alpha).fit(x[train_index], y[train_index])
+        np.testing.assert_allclose(coefs[alpha_id], ridge.coef_, rtol=1e-10)
+        assert intercepts[alpha_id] == pytest.approx(ridge.intercept_, rel=1e-10)
+        np.testing.assert_allclose(
+            y_predict_valid[:, alpha_id], ridge.predict(x[valid_index]), rtol=1e-10
+        )
+
+
+def test_make_normal_equation_with_float32_feature(ridge_dataset):
+    x, y = ridge_dataset
+    alphas = (1e-8,)
+    ridge = Ridge(alpha=alphas[0]).fit(x, y)
+
+    x_centered = x.astype(np.float32)
+    normal_equation = make_normal_equation(x_centered, y)
+    x_valid = x_centered[:40]
+    train_normal_equation = normal_equation - make_normal_equation_of_subset(
+        x_valid, y[:40], normal_equation
+    )
+
+    # The products are accumulated in float64 even if the feature matrix is float32
+    assert normal_equation.gram.dtype == np.float64
+    assert train_normal_equation.gram.dtype == np.float64
+    coefs, intercepts = normal_equation.solve(alphas)
+    np.testing.assert_allclose(coefs[0], ridge.coef_, rtol=1e-4)
+    assert intercepts[0] == pytest.approx(ridge.intercept_, rel=1e-4)
+    train_normal_equation.solve(alphas)
+
+
+def test_solve_normal_equation_with_singular_gram(ridge_dataset):
+    x, y = ridge_dataset
+    # The constant column makes the Gram matrix singular without regularization
+    x = np.hstack((x, np.ones((x.shape[0], 1))))
+    linear_regression = LinearRegression().fit(x, y)
+
+    x_centered = x.copy()
+    normal_equation = make_normal_equation(x_centered, y)
+    coefs, intercepts = normal_equation.solve((0.0,))
+
+    np.testing.assert_allclose(
+        normal_equation.predict(x_centered, coefs[0], intercepts[0]),
+        linear_regression.predict(x),
+        rtol=1e-8,
+    )
@@ -1,6 +1,7 @@
+import numpy as np
 import pytest
 
-from para_mlp.train import make_param_grid
+from para_mlp.train import make_param_grid, train_and_eval
 from para_mlp.utils import rmse
 
 
@@ -21,6 +22,12 @@ def test_make_param_grid(test_config):
     expected_param_grid["cutoff_radius"] = (7.0,)
     assert param_grid == expected_param_grid
 
+    config.cutoff_radius_min = 6.0
+    config.cutoff_radius_max = 9.0
+    param_grid = make_param_grid(config)
+    expected_param_grid["cutoff_radius"] = (6.0, 8.0)
+    assert param_grid == expected_param_grid
+
 
 def test_train_and_eval(
     trained_model_multiconfig, divided_dataset_multiconfig, n_atoms_in_structure
@@ -57,3 +64,38 @@ def test_train_and_eval(
 
         assert rmse_energy == pytest.approx(seko_rmse_energy[config_key], rel=1e-7)
         assert rmse_force == pytest.approx(seko_rmse_force[config_key], rel=1e-8)
+
+
+def test_train_and_eval_with_float32_feature(
+    test_config, divided_dataset_multiconfig, n_atoms_in_structure
+):
+    # The retained model is trained in float64 regardless of use_float32_feature
+    seko_rmse_energy = {
+        "one_specie": 10.254324039723619,
+        "two_specie": 9.496509871532915,
+    }
+
+    for config_key in test_config.keys():
+        config = test_config[config_key]
+        config.use_float32_feature = True
+        divided_dataset = divided_dataset_multiconfig[config_key]
+        trained_model = train_and_eval(
+            config, divided_dataset["kfold"], divided_dataset["test"]
+        )
+
+        test_structures = divided_dataset["test"]["structures"]
+        n_structure_list = divided_dataset["test"]["n_structure"]
+        y_predict = trained_model.predict(test_structures, n_structure_list)
+
+        energy_id_end = len(test_structures)
+        rmse_energy = (
+            rmse(
+                y_predict[:energy_id_end] / n_atoms_in_structure,
+                divided_dataset["test"]["target"][:energy_id_end]
+                / n_atoms_in_structure,
+            )
+            * 1e3
+        )
+
+        assert trained_model.coef.dtype == np.float64
+        assert rmse_energy == pytest.approx(seko_rmse_energy[config_key], rel=1e-7)
@@ -1,6 +1,7 @@
+import numpy as np
 import pytest
 
-from para_mlp.utils import make_yids_for_structure_ids
+from para_mlp.utils import make_sample_weight, make_yids_for_structure_ids
 
 
 @pytest.mark.parametrize(
@@ -66,3 +67,16 @@ def test_make_yids_for_structure_ids(
         structure_id, energy_id_length, force_id_unit, use_force=True
     )
     assert yids == expected_yids
+
+
+def test_make_sample_weight():
+    high_energy_struct_dict_list = [
+        {"yids": {"energy": [1, 1], "force": [5, 6, 6]}, "weight": 3.0},
+        {"yids": {"energy": [2], "force": []}, "weight": 0.1},
+    ]
+
+    sample_weight = make_sample_weight(8, 4, 2.0, 0.5, high_energy_struct_dict_list)
+
+    # The weight of a high energy structure is applied once even if its yids repeat
+    expected_sample_weight = np.array([2.0, 6.0, 0.2, 2.0, 0.5, 1.5, 1.5, 0.5])
+    np.testing.assert_allclose(sample_weight, expected_sample_weight)